@@ -1,4 +1,5 @@
 import os
+import time
 
 from cs50 import SQL
 from flask import Flask, flash, jsonify, redirect, render_template, request, session, url_for
@@ -8,13 +9,11 @@ from tempfile import mkdtemp
 from werkzeug.exceptions import default_exceptions, HTTPException, InternalServerError
 from werkzeug.security import check_password_hash, generate_password_hash
 
-from helpers import apology, login_required, lookup, usd
+from helpers import apology, login_required, lookup, lookup_batch, usd
+from screening import FetchError, Pipeline, SCREENS, csv_universe, iex_fetch
+from sizing import WEIGHTINGS, allocate, basket, weights
 
-from statistics import mean
 import pandas as pd
-import requests
-import math
-from scipy import stats
 
 # Configure application
 app = Flask(__name__)
@@ -49,6 +48,11 @@ if not os.environ.get("API_KEY"):
 
 IEX_CLOUD_API_TOKEN = os.environ.get("IEX_CLOUD_API_TOKEN")
 
+def holdings(user_id):
+    """Return the symbols the user holds, with their total shares"""
+    return db.execute("SELECT symbol, SUM(shares) as total_shares FROM transactions WHERE user_id = :user_id GROUP BY symbol HAVING total_shares > 0", user_id=user_id)
+
+
 @app.route("/")
 @login_required
 def index():
@@ -290,7 +294,7 @@ def sell():
         return redirect(url_for("index"))
 
     else:
-        summary = db.execute("SELECT symbol, SUM(shares) as total_shares FROM transactions WHERE user_id = :user_id GROUP BY symbol HAVING total_shares > 0", user_id=session["user_id"])
+        summary = holdings(session["user_id"])
 
         return render_template("sell.html", summary=summary)
 
@@ -306,112 +310,175 @@ for code in default_exceptions:
     app.errorhandler(code)(errorhandler)
 
 
+# The fetched universe is shared by every screen, weighting and user for a while,
+# so switching screens doesn't redo the ~5 batch calls each time
+SCREENING_TTL = 15 * 60
+screening_cache = {"pipeline": None, "created": 0}
+
+
+def screening_pipeline():
+    """Return the shared screening pipeline, fetching a fresh one once it is stale"""
+    if screening_cache["pipeline"] is not None and time.time() - screening_cache["created"] <= SCREENING_TTL:
+        return screening_cache["pipeline"]
+
+    pipeline = Pipeline(csv_universe("sp_500_stocks.csv"), iex_fetch(IEX_CLOUD_API_TOKEN))
+    # only a complete fetch is shared; an empty or partial one is retried on the next request
+    if not pipeline.data.empty and not pipeline.failed:
+        screening_cache["pipeline"] = pipeline
+        screening_cache["created"] = time.time()
+    return pipeline
+
+
+def shares_held(user_id):
+    """Return the user's shares held per symbol"""
+    return pd.Series({row["symbol"]: row["total_shares"] for row in holdings(user_id)}, dtype=int)
+
+
+def size_positions(weighting):
+    """Allocate the portfolio across the screened picks and render the analysis page"""
+    screening = session["screening"]
+    held = pd.Series(screening["holdings"], dtype=int)
+    volatility = pd.Series(screening["volatility"], dtype=float)
+
+    tables = []
+    session["rebalance"] = {}
+    for name in screening["names"]:
+        picks = pd.DataFrame(screening["picks"][name])
+        scores = picks.set_index("Symbol")[SCREENS[name].factor]
+        prices = picks.set_index("Symbol")["Price"]
+        targets = allocate(prices, weights(weighting, scores, volatility), screening["capital"])
+
+        picks["Target Shares"] = targets.values
+        picks["Number of Shares to Buy"] = (targets - held.reindex(targets.index, fill_value=0)).values
+
+        # only offer a rebalance when shares were actually sized, and list every order it
+        # would place, including sells of holdings that aren't picks
+        orders = None
+        if targets.sum() > 0:
+            orders = basket(targets, held)
+            session["rebalance"][name] = {symbol: int(shares) for symbol, shares in targets.items()}
+        tables.append((name, picks.to_html(classes='data'), orders))
+
+    return render_template("analysis.html", tables=tables, screens=SCREENS, selected=screening["names"],
+                           weightings=WEIGHTINGS, weighting=weighting, capital=screening["capital"])
+
+
 @app.route("/analysis", methods=["GET", "POST"])
 @login_required
 def analysis():
-    stocks = pd.read_csv('sp_500_stocks.csv')
-
-# Function sourced from
-# https://stackoverflow.com/questions/312443/how-do-you-split-a-list-into-evenly-sized-chunks
-    def chunks(lst, n):
-        """Yield successive n-sized chunks from lst."""
-        for i in range(0, len(lst), n):
-            yield lst[i:i + n]
-
-    symbol_groups = list(chunks(stocks['symbol'], 100))
-    symbol_strings = []
-
-    for i in range(0, len(symbol_groups)):
-        symbol_strings.append(','.join(symbol_groups[i]))
-    #     print(symbol_strings[i])
-
-    my_columns = ['Ticker', 'Price', 'One-Year Price Return', 'Number of Shares to Buy']
-
-    final_dataframe = pd.DataFrame(columns = my_columns)
-
-    for symbol_string in symbol_strings:
-    #     print(symbol_strings)
-        batch_api_call_url = f'https://sandbox.iexapis.com/stable/stock/market/batch/?types=stats,quote&symbols={symbol_string}&token={IEX_CLOUD_API_TOKEN}'
-        data = requests.get(batch_api_call_url).json()
-        for symbol in symbol_string.split(','):
-            final_dataframe = final_dataframe.append(
-                                            pd.Series([symbol,
-                                                      data[symbol]['quote']['latestPrice'],
-                                                      data[symbol]['stats']['year1ChangePercent'],
-                                                      'N/A'
-                                                      ],
-                                                      index = my_columns),
-                                            ignore_index = True)
-
-    final_dataframe.sort_values('One-Year Price Return', ascending = False, inplace = True)
-    final_dataframe = final_dataframe[:51]
-    final_dataframe.reset_index(drop = True, inplace = True)
-
-
-    hqm_columns = [
-                    'Symbol',
-                    'Price',
-                    'Five-Year Price Return',
-                    'Five-Year Return Percentile',
-                    'Two-Year Price Return',
-                    'Two-Year Return Percentile',
-                    'One-Year Price Return',
-                    'One-Year Return Percentile',
-                    'Six-Month Price Return',
-                    'Six-Month Return Percentile',
-                    'Quality Score'
-                    ]
-
-    hqm_dataframe = pd.DataFrame(columns = hqm_columns)
-
-    for symbol_string in symbol_strings:
-        #print(symbol_strings)
-        batch_api_call_url = f'https://sandbox.iexapis.com/stable/stock/market/batch/?types=stats,quote&symbols={symbol_string}&token={IEX_CLOUD_API_TOKEN}'
-
-        data = requests.get(batch_api_call_url).json()
-        for symbol in symbol_string.split(','):
-            hqm_dataframe = hqm_dataframe.append(
-                                            pd.Series([symbol,
-                                                       data[symbol]['quote']['latestPrice'],
-
-                                                       data[symbol]['stats']['year5ChangePercent'],
-                                                       'N/A',
-                                                       data[symbol]['stats']['year2ChangePercent'],
-                                                       'N/A',
-                                                       data[symbol]['stats']['year1ChangePercent'],
-                                                       'N/A',
-                                                       data[symbol]['stats']['month6ChangePercent'],
-                                                       'N/A',
-                                                       'N/A'
-                                                       ],
-                                                      index = hqm_columns),
-                                            ignore_index = True)
-
-
-    hqm_dataframe.dropna(inplace=True)
-
-    time_periods = [
-                    'Five-Year',
-                    'Two-Year',
-                    'One-Year',
-                    'Six-Month'
-                    ]
-
-    for row in hqm_dataframe.index:
-        for time_period in time_periods:
-            hqm_dataframe.loc[row, f'{time_period} Return Percentile'] = stats.percentileofscore(hqm_dataframe[f'{time_period} Price Return'], hqm_dataframe.loc[row, f'{time_period} Price Return'])/100
-
-
-    for row in hqm_dataframe.index:
-        momentum_percentiles = []
-        for time_period in time_periods:
-            momentum_percentiles.append(hqm_dataframe.loc[row, f'{time_period} Return Percentile'])
-        hqm_dataframe.loc[row, 'Quality Score'] = mean(momentum_percentiles)
-
-    hqm_dataframe.sort_values(by = 'Quality Score', ascending = True)
-    hqm_dataframe = hqm_dataframe[:51]
-
-    #print(hqm_dataframe.to_html())
-
-    return render_template("analysis.html", tables=[hqm_dataframe.to_html(classes='data')])
+    """Screen the S&P 500, by default for high-quality momentum"""
+    weighting = request.values.get("weighting", "equal")
+    if weighting not in WEIGHTINGS:
+        return apology("unknown weighting", 400)
+
+    # re-sizing with another weighting reuses the picks and prices already fetched
+    if request.method == "POST":
+        if "screening" not in session:
+            return redirect(url_for("analysis"))
+        return size_positions(weighting)
+
+    # e.g. /analysis?screen=momentum&screen=value computes both from one fetch
+    names = request.args.getlist("screen") or ["momentum"]
+    if any(name not in SCREENS for name in names):
+        return apology("unknown screen", 400)
+
+    try:
+        pipeline = screening_pipeline()
+    except FetchError:
+        return apology("could not fetch stock data, try again later", 503)
+    if pipeline.data.empty:
+        return apology("no stock data available, try again later", 503)
+    if pipeline.failed:
+        flash(f"{len(pipeline.failed)} of {len(pipeline.symbols)} stocks could not be fetched and were left out")
+    results = pipeline.run([SCREENS[name] for name in names])
+
+    # value the portfolio, size positions and trade all at lookup() prices
+    held = shares_held(session["user_id"])
+    cash = db.execute("SELECT cash FROM users WHERE id = :user_id", user_id=session["user_id"])[0]["cash"]
+    symbols = sorted(set(held.index).union(*(results[name]["Symbol"] for name in names)))
+    quotes = lookup_batch(symbols)
+    if any(symbol not in quotes for symbol in held.index):
+        return apology("could not price your holdings", 503)
+    prices = pd.Series({symbol: quote["price"] for symbol, quote in quotes.items()}, dtype=float)
+    capital = cash + float((held * prices.reindex(held.index)).sum())
+
+    picks = {}
+    for name in names:
+        # names without a quote keep a blank price and get no shares
+        results[name]["Price"] = prices.reindex(results[name]["Symbol"]).values
+        picks[name] = results[name].to_dict("list")
+    pick_symbols = sorted(set().union(*(results[name]["Symbol"] for name in names)))
+
+    session["screening"] = {
+        "names": names,
+        "picks": picks,
+        "volatility": pipeline.score("Volatility").reindex(pick_symbols).dropna().to_dict(),
+        "holdings": {symbol: int(shares) for symbol, shares in held.items()},
+        "capital": capital,
+    }
+    return size_positions(weighting)
+
+
+@app.route("/rebalance", methods=["POST"])
+@login_required
+def rebalance():
+    """Trade the portfolio into an allocation shown on the analysis page"""
+    targets = session.get("rebalance", {}).get(request.form.get("screen"))
+    if targets is None:
+        return apology("run an analysis before rebalancing", 400)
+    targets = pd.Series(targets, dtype=int)
+    # an allocation without shares would only sell everything
+    if targets.sum() <= 0:
+        return apology("nothing to rebalance into", 400)
+
+    # quote everything the basket can touch before locking the database, like buy and sell do
+    symbols = sorted(set(targets[targets > 0].index) | set(shares_held(session["user_id"]).index))
+    prices = {}
+    for symbol in symbols:
+        stock = lookup(symbol)
+        if stock == None:
+            return apology(f"could not get a quote for {symbol}", 503)
+        prices[symbol] = stock["price"]
+
+    # holdings and cash are re-read and checked inside the transaction, so a double
+    # submit can't pass the checks twice; the whole basket lands or none of it does
+    error = None
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        orders = basket(targets, shares_held(session["user_id"]))
+        if any(symbol not in prices for symbol in orders.index):
+            error = "holdings changed during the rebalance, please try again"
+        else:
+            # sells come first in the basket, so only the net cost has to be covered
+            cost = round(sum(prices[symbol] * int(shares) for symbol, shares in orders.items()), 2)
+            cash = db.execute("SELECT cash FROM users WHERE id = :user_id", user_id=session["user_id"])[0]["cash"]
+            if cost > round(cash, 2):
+                error = "Not enough cash to rebalance"
+
+        if error or orders.empty:
+            db.execute("ROLLBACK")
+        else:
+            db.execute("UPDATE users SET cash = cash - :price WHERE id = :user_id", price=cost, user_id=session["user_id"])
+            for symbol, shares in orders.items():
+                db.execute("INSERT INTO transactions (user_id, symbol, shares, price_per_share) VALUES(:user_id, :symbol, :shares, :price)",
+                           user_id=session["user_id"],
+                           symbol=symbol,
+                           shares=int(shares),
+                           price=prices[symbol])
+            db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+
+    if error:
+        return apology(error, 403)
+    if orders.empty:
+        flash("Already balanced!")
+        return redirect(url_for("index"))
+
+    # every allocation was sized against the portfolio before this trade
+    session.pop("rebalance", None)
+    session.pop("screening", None)
+    flash("Rebalanced!")
 
+    return redirect(url_for("index"))
@@ -62,6 +62,38 @@ def lookup(symbol):
         return None
 
 
+def lookup_batch(symbols):
+    """Look up quotes for many symbols, 100 per request; symbols that fail are left out."""
+    quotes = {}
+    api_key = os.environ.get("API_KEY")
+    for i in range(0, len(symbols), 100):
+        symbol_string = ",".join(urllib.parse.quote_plus(symbol) for symbol in symbols[i:i + 100])
+
+        # Contact API
+        try:
+            response = requests.get(f"https://cloud.iexapis.com/stable/stock/market/batch?types=quote&symbols={symbol_string}&token={api_key}")
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError):
+            continue
+
+        # Parse response, in the same shape as lookup()
+        for symbol in symbols[i:i + 100]:
+            try:
+                quote = data[symbol]["quote"]
+                quotes[symbol] = {
+                    "name": quote["companyName"],
+                    "price": float(quote["latestPrice"]),
+                    "symbol": quote["symbol"],
+                    "change": quote["change"],
+                    "changePercent": float(quote["changePercent"]),
+                    "latestTime": quote["latestTime"]
+                }
+            except (KeyError, TypeError, ValueError):
+                continue
+    return quotes
+
+
 def usd(value):
     """Format value as USD."""
     return f"${value:,.2f}"
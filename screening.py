@@ -0,0 +1,192 @@
+import requests
+import pandas as pd
+
+
+# Fields pulled out of each IEX batch response, keyed by our column name.
+# Each value is (endpoint, field) so one batch call serves every screen.
+FIELDS = {
+    "Price": ("quote", "latestPrice"),
+    "PE Ratio": ("quote", "peRatio"),
+    "Five-Year Price Return": ("stats", "year5ChangePercent"),
+    "Two-Year Price Return": ("stats", "year2ChangePercent"),
+    "One-Year Price Return": ("stats", "year1ChangePercent"),
+    "Six-Month Price Return": ("stats", "month6ChangePercent"),
+    "52-Week High": ("stats", "week52high"),
+    "52-Week Low": ("stats", "week52low"),
+}
+
+TIME_PERIODS = ["Five-Year", "Two-Year", "One-Year", "Six-Month"]
+
+BATCH_SIZE = 100
+
+
+def csv_universe(path="sp_500_stocks.csv"):
+    """Return a universe loader reading symbols from a CSV with a 'symbol' column."""
+    def load():
+        return list(pd.read_csv(path)["symbol"])
+    return load
+
+
+class FetchError(Exception):
+    """Raised when no batch of the universe could be fetched."""
+
+
+def iex_fetch(token, batch_size=BATCH_SIZE):
+    """
+    Return a fetcher pulling quote and stats for symbols via IEX batch calls.
+
+    Symbols of failed batches are listed in the frame's attrs["failed"];
+    if every batch fails, FetchError is raised instead.
+    """
+    def fetch(symbols):
+        rows = []
+        failed = []
+        for i in range(0, len(symbols), batch_size):
+            symbol_string = ",".join(symbols[i:i + batch_size])
+            batch_api_call_url = f"https://sandbox.iexapis.com/stable/stock/market/batch/?types=stats,quote&symbols={symbol_string}&token={token}"
+            try:
+                response = requests.get(batch_api_call_url)
+                response.raise_for_status()
+                data = response.json()
+            except (requests.RequestException, ValueError):
+                failed.extend(symbols[i:i + batch_size])
+                continue
+            for symbol in symbols[i:i + batch_size]:
+                if not data.get(symbol):
+                    continue
+                row = {"Symbol": symbol}
+                for column, (endpoint, field) in FIELDS.items():
+                    row[column] = (data[symbol].get(endpoint) or {}).get(field)
+                rows.append(row)
+        if symbols and len(failed) == len(symbols):
+            raise FetchError(f"all {len(symbols)} symbols failed to fetch")
+        frame = pd.DataFrame(rows, columns=["Symbol"] + list(FIELDS)).set_index("Symbol")
+        frame.attrs["failed"] = failed
+        return frame
+    return fetch
+
+
+def momentum_score(data):
+    """High-quality momentum: mean percentile of the four period returns, with the percentiles."""
+    returns = data[[f"{period} Price Return" for period in TIME_PERIODS]].astype(float).dropna()
+    percentiles = returns.rank(pct=True)
+    percentiles.columns = [f"{period} Return Percentile" for period in TIME_PERIODS]
+    percentiles["Quality Score"] = percentiles.mean(axis=1)
+    return percentiles
+
+
+def value_score(data):
+    """Earnings yield (inverse P/E); loss-making names are excluded."""
+    pe = data["PE Ratio"].astype(float)
+    return (1 / pe[pe > 0]).dropna()
+
+
+def volatility(data):
+    """52-week trading range relative to price, used as a volatility proxy."""
+    high = data["52-Week High"].astype(float)
+    low = data["52-Week Low"].astype(float)
+    price = data["Price"].astype(float)
+    return ((high - low) / price[price > 0]).dropna()
+
+
+def low_volatility_score(data):
+    """Negated volatility so that calmer names rank higher."""
+    return -volatility(data)
+
+
+# A factor returns a Series of scores indexed by symbol, or a DataFrame holding
+# the score in the column named after the factor plus extra columns for screens.
+FACTORS = {
+    "Quality Score": momentum_score,
+    "Value Score": value_score,
+    "Volatility": volatility,
+    "Low Volatility Score": low_volatility_score,
+}
+
+
+class Screen:
+    """A ranking of the universe by one factor, keeping the top rows."""
+
+    def __init__(self, name, title, factor, top=51, ascending=False, columns=None):
+        self.name = name
+        self.title = title
+        self.factor = factor
+        self.top = top
+        self.ascending = ascending
+        self.columns = columns or ["Price"]
+
+
+SCREENS = {
+    "momentum": Screen("momentum", "High-quality momentum", "Quality Score",
+                       columns=["Price"] + [column for period in TIME_PERIODS
+                                            for column in (f"{period} Price Return", f"{period} Return Percentile")]),
+    "value": Screen("value", "Value", "Value Score", columns=["Price", "PE Ratio"]),
+    "low_volatility": Screen("low_volatility", "Low volatility", "Low Volatility Score",
+                             columns=["Price", "52-Week High", "52-Week Low"]),
+}
+
+
+class Pipeline:
+    """
+    Screening pipeline: universe -> fetch -> factors -> rank -> select.
+
+    Every stage is evaluated lazily and cached, so any number of screens
+    share one fetch of the universe and each factor is computed at most once.
+    """
+
+    def __init__(self, universe, fetch, factors=None):
+        self.universe = universe
+        self.fetch = fetch
+        self.factors = dict(FACTORS if factors is None else factors)
+        self._symbols = None
+        self._data = None
+        self._factors = {}
+
+    @property
+    def symbols(self):
+        if self._symbols is None:
+            self._symbols = self.universe()
+        return self._symbols
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self.fetch(self.symbols)
+        return self._data
+
+    @property
+    def failed(self):
+        """Symbols the fetch reported as failed."""
+        return self.data.attrs.get("failed", [])
+
+    def factor(self, factor):
+        """Return the factor's raw result, computing it once."""
+        if factor not in self._factors:
+            if factor not in self.factors:
+                raise KeyError(f"unknown factor: {factor}")
+            self._factors[factor] = self.factors[factor](self.data)
+        return self._factors[factor]
+
+    def score(self, factor):
+        """Return the factor as a Series of scores indexed by symbol."""
+        result = self.factor(factor)
+        if isinstance(result, pd.DataFrame):
+            return result[factor]
+        return result
+
+    def select(self, screen):
+        """Rank the universe by the screen's factor and keep its top rows."""
+        scores = self.score(screen.factor).sort_values(ascending=screen.ascending)
+        picks = scores[:screen.top]
+        result = self.data.loc[picks.index]
+        extra = self.factor(screen.factor)
+        if isinstance(extra, pd.DataFrame):
+            result = result.join(extra.drop(columns=screen.factor))
+        result = result[screen.columns].copy()
+        result[screen.factor] = picks
+        result.index.name = "Symbol"
+        return result.reset_index()
+
+    def run(self, screens):
+        """Select every screen against the same fetched dataset."""
+        return {screen.name: self.select(screen) for screen in screens}
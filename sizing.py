@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+
+WEIGHTINGS = ["equal", "score", "volatility"]
+
+
+def weights(scheme, scores, volatility=None):
+    """
+    Return portfolio weights summing to 1, indexed like scores.
+
+    equal: 1/n each. score: proportional to score rank, so the best pick
+    gets the most. volatility: proportional to 1/volatility.
+    """
+    if scheme == "equal":
+        raw = pd.Series(1.0, index=scores.index)
+    elif scheme == "score":
+        raw = scores.astype(float).rank()
+    elif scheme == "volatility":
+        vol = volatility.reindex(scores.index).astype(float)
+        # names without a usable volatility get the median instead of dropping out
+        vol = vol.where(vol > 0).fillna(vol[vol > 0].median())
+        raw = 1 / vol
+    else:
+        raise ValueError(f"unknown weighting: {scheme}")
+    raw = raw.fillna(0)
+    if raw.sum() <= 0:
+        return pd.Series(1.0 / len(raw), index=raw.index) if len(raw) else raw
+    return raw / raw.sum()
+
+
+def allocate(prices, weights, capital):
+    """
+    Allocate capital across symbols in whole shares.
+
+    Names without a positive price get nothing. Each other name gets
+    floor(weight * capital / price) shares. Leftover cash then buys more
+    shares of the names furthest below target, skipping names it can't
+    afford, until no name is affordable.
+    """
+    prices = prices.reindex(weights.index).astype(float)
+    valid = prices > 0
+    # names that can't be priced hand their share of the budget to the rest
+    weights = weights.where(valid, 0.0)
+    if weights.sum() > 0:
+        weights = weights / weights.sum()
+    target = weights * capital
+    shares = np.floor((target / prices.where(valid)).fillna(0.0))
+
+    priced = prices[valid & (target > 0)]
+    leftover = capital - (shares[priced.index] * priced).sum()
+    while True:
+        # one share each, furthest below target first, over the names that still fit
+        affordable = priced[priced <= leftover]
+        if affordable.empty:
+            break
+        shortfall = target[affordable.index] - shares[affordable.index] * affordable
+        order = shortfall.sort_values(ascending=False).index
+        fits = affordable[order].cumsum() <= leftover
+        bought = fits[fits].index
+        shares[bought] += 1
+        leftover -= affordable[bought].sum()
+
+    return shares.astype(int)
+
+
+def basket(targets, holdings):
+    """
+    Return the orders turning holdings into targets, sells first.
+
+    Raises ValueError when the targets hold no shares at all, since the
+    basket would then just sell everything.
+    """
+    if targets.sum() <= 0:
+        raise ValueError("allocation holds no shares")
+    symbols = targets.index.union(holdings.index)
+    delta = targets.reindex(symbols, fill_value=0) - holdings.reindex(symbols, fill_value=0)
+    delta = delta[delta != 0].astype(int)
+    return delta.sort_values()
@@ -0,0 +1,120 @@
+import pandas as pd
+import pytest
+import requests
+
+import screening
+from screening import FetchError, Pipeline, SCREENS, iex_fetch, momentum_score, value_score
+
+
+DATA = pd.DataFrame({
+    "Price": [100.0, 50.0, 20.0, 10.0],
+    "PE Ratio": [10.0, 0.0, -5.0, 20.0],
+    "Five-Year Price Return": [0.4, 0.3, 0.2, 0.1],
+    "Two-Year Price Return": [0.4, 0.3, 0.1, 0.2],
+    "One-Year Price Return": [0.4, 0.1, 0.3, 0.2],
+    "Six-Month Price Return": [0.4, 0.3, 0.2, 0.1],
+    "52-Week High": [110.0, 80.0, 21.0, 15.0],
+    "52-Week Low": [90.0, 40.0, 19.0, 5.0],
+}, index=pd.Index(["A", "B", "C", "D"], name="Symbol"))
+
+
+class FakeFetch:
+    def __init__(self, data=DATA):
+        self.data = data
+        self.calls = 0
+
+    def __call__(self, symbols):
+        self.calls += 1
+        return self.data.loc[symbols]
+
+
+def pipeline(fetch=None, factors=None):
+    return Pipeline(lambda: list(DATA.index), fetch or FakeFetch(), factors)
+
+
+def test_screens_share_one_fetch():
+    fetch = FakeFetch()
+    results = pipeline(fetch).run(SCREENS.values())
+    assert fetch.calls == 1
+    assert set(results) == set(SCREENS)
+
+
+def test_factor_computed_once():
+    calls = []
+
+    def counted(data):
+        calls.append(1)
+        return data["Price"]
+
+    p = pipeline(factors={"Price Score": counted})
+    p.score("Price Score")
+    p.score("Price Score")
+    p.factor("Price Score")
+    assert len(calls) == 1
+
+
+def test_unknown_factor():
+    with pytest.raises(KeyError):
+        pipeline().score("Nope")
+
+
+def test_momentum_percentiles_and_ranking():
+    result = momentum_score(DATA)
+    assert list(result["Five-Year Return Percentile"]) == [1.0, 0.75, 0.5, 0.25]
+    assert list(result["One-Year Return Percentile"]) == [1.0, 0.25, 0.75, 0.5]
+    assert result.loc["A", "Quality Score"] == pytest.approx(1.0)
+
+    picks = pipeline().select(SCREENS["momentum"])
+    assert picks["Symbol"].iloc[0] == "A"
+    assert picks["Quality Score"].is_monotonic_decreasing
+
+
+def test_select_keeps_percentile_columns():
+    picks = pipeline().select(SCREENS["momentum"])
+    for period in screening.TIME_PERIODS:
+        assert f"{period} Return Percentile" in picks.columns
+    assert picks.set_index("Symbol").loc["C", "Two-Year Return Percentile"] == 0.25
+
+
+def test_value_drops_non_positive_pe():
+    scores = value_score(DATA)
+    assert sorted(scores.index) == ["A", "D"]
+    assert list(pipeline().select(SCREENS["value"])["Symbol"]) == ["A", "D"]
+
+
+def test_low_volatility_ranks_calmest_first():
+    # ranges relative to price: A 0.2, B 0.8, C 0.1, D 1.0
+    picks = pipeline().select(SCREENS["low_volatility"])
+    assert list(picks["Symbol"]) == ["C", "A", "B", "D"]
+
+
+class Response:
+    def __init__(self, data, ok=True):
+        self.data = data
+        self.ok = ok
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError("500")
+
+    def json(self):
+        return self.data
+
+
+def test_iex_fetch_reports_failed_batches(monkeypatch):
+    def get(url):
+        if "symbols=A,B" in url:
+            return Response({"A": {"quote": {"latestPrice": 1.0}, "stats": None}, "B": None})
+        return Response(None, ok=False)
+
+    monkeypatch.setattr(screening.requests, "get", get)
+    data = iex_fetch("token", batch_size=2)(["A", "B", "C", "D"])
+    assert list(data.index) == ["A"]
+    assert data.loc["A", "Price"] == 1.0
+    assert data.attrs["failed"] == ["C", "D"]
+
+
+def test_iex_fetch_raises_when_every_batch_fails(monkeypatch):
+    monkeypatch.setattr(screening.requests, "get", lambda url: Response(None, ok=False))
+    with pytest.raises(FetchError):
+        iex_fetch("token", batch_size=2)(["A", "B", "C"])
@@ -0,0 +1,106 @@
+import math
+
+import pandas as pd
+import pytest
+
+from sizing import allocate, basket, weights
+
+
+def test_equal_weights_sum_to_one():
+    scores = pd.Series([0.9, 0.5, 0.1], index=["A", "B", "C"])
+    result = weights("equal", scores)
+    assert list(result) == pytest.approx([1 / 3] * 3)
+
+
+def test_score_weights_favour_best_pick():
+    scores = pd.Series([-0.1, -0.5, -0.3], index=["A", "B", "C"])
+    result = weights("score", scores)
+    assert result.sum() == pytest.approx(1)
+    assert result.idxmax() == "A"
+    assert result.idxmin() == "B"
+
+
+def test_volatility_weights_inverse_with_median_fallback():
+    scores = pd.Series(1.0, index=["A", "B", "C", "D"])
+    volatility = pd.Series({"A": 0.2, "B": 0.4, "C": 0.0})
+    result = weights("volatility", scores, volatility)
+    # C has no usable volatility and D none at all: both fall back to the 0.3 median
+    raw = pd.Series({"A": 1 / 0.2, "B": 1 / 0.4, "C": 1 / 0.3, "D": 1 / 0.3})
+    assert list(result) == pytest.approx(list(raw / raw.sum()))
+
+
+def test_unknown_weighting():
+    with pytest.raises(ValueError):
+        weights("cap", pd.Series([1.0], index=["A"]))
+
+
+def test_allocate_floors_then_spends_leftover():
+    prices = pd.Series({"A": 100.0, "B": 300.0})
+    shares = allocate(prices, pd.Series({"A": 0.5, "B": 0.5}), 1000)
+    # floor gives A=5, B=1 with $200 left; B is furthest below target but costs $300, so A takes it
+    assert shares.to_dict() == {"A": 7, "B": 1}
+
+    shares = allocate(prices, pd.Series({"A": 0.5, "B": 0.5}), 1100)
+    # floor gives A=5, B=1 with $300 left, enough for one more B
+    assert shares.to_dict() == {"A": 5, "B": 2}
+
+
+def test_allocate_never_spends_above_capital():
+    prices = pd.Series([13.7, 251.2, 88.1, 3.3, 1020.5], index=list("ABCDE"))
+    for capital in [0, 50, 999.99, 12345.67, 250000]:
+        for scheme in ["equal", "score"]:
+            shares = allocate(prices, weights(scheme, prices), capital)
+            assert (shares >= 0).all()
+            assert (shares * prices).sum() <= capital + 1e-9
+
+
+def test_allocate_skips_unaffordable_name_first_in_line():
+    prices = pd.Series({"A": 4000.0, "B": 30.0, "C": 25.0})
+    shares = allocate(prices, weights("equal", prices), 10000)
+    # A has the largest dollar shortfall but never fits the leftover; B and C soak it up
+    assert shares["A"] == 0
+    spent = (shares * prices).sum()
+    assert spent <= 10000
+    assert 10000 - spent < 25
+
+
+def test_allocate_spends_down_to_cheapest_price():
+    prices = pd.Series([20.0 + 5.6 * i for i in range(51)] + [4000.0])
+    shares = allocate(prices, weights("equal", prices), 10000)
+    spent = (shares * prices).sum()
+    assert spent <= 10000
+    assert 10000 - spent < prices.min()
+
+
+def test_allocate_skips_zero_and_missing_prices():
+    prices = pd.Series({"A": 50.0, "B": 0.0, "C": math.nan})
+    shares = allocate(prices, pd.Series({"A": 1 / 3, "B": 1 / 3, "C": 1 / 3, "D": 0.0}), 300)
+    assert shares.to_dict() == {"A": 6, "B": 0, "C": 0, "D": 0}
+
+
+def test_basket_sells_first():
+    targets = pd.Series({"A": 5, "B": 2, "C": 0})
+    holdings = pd.Series({"B": 4, "C": 3, "D": 1})
+    orders = basket(targets, holdings)
+    assert orders.to_dict() == {"C": -3, "B": -2, "D": -1, "A": 5}
+    assert list(orders) == sorted(orders)
+
+
+def test_basket_empty_when_balanced():
+    targets = pd.Series({"A": 2, "B": 0})
+    holdings = pd.Series({"A": 2})
+    assert basket(targets, holdings).empty
+
+
+def test_basket_refuses_empty_allocation():
+    holdings = pd.Series({"AAPL": 10, "MSFT": 5})
+    with pytest.raises(ValueError):
+        basket(pd.Series({}, dtype=int), holdings)
+
+
+def test_basket_refuses_allocation_with_no_priced_picks():
+    prices = pd.Series({"A": math.nan, "B": math.nan})
+    targets = allocate(prices, weights("equal", prices), 10000)
+    assert targets.sum() == 0
+    with pytest.raises(ValueError):
+        basket(targets, pd.Series({"AAPL": 10}))